@@ -0,0 +1,308 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# __BEGIN_LICENSE__
+#  Copyright (c) 2009-2013, United States Government as represented by the
+#  Administrator of the National Aeronautics and Space Administration. All
+#  rights reserved.
+#
+#  The NGT platform is licensed under the Apache License, Version 2.0 (the
+#  "License"); you may not use this file except in compliance with the
+#  License. You may obtain a copy of the License at
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+# __END_LICENSE__
+
+"""
+A replacement for GNU parallel, for running jobs on the local machine
+and on other nodes via ssh. It takes those GNU parallel options which
+ASP uses, so either can be invoked in the same way:
+
+  asp_parallel_utils.py [options] command
+
+The arguments for each job are read, one line per job, from the file
+given with -a, else from standard input as they arrive. In the command,
+{} is replaced by the line and {1}, {2}, ... by its columns, if --colsep
+is given. A job is started on the first node with a free slot.
+"""
+
+import sys, os, re, time, signal, subprocess, threading, optparse, pipes
+from collections import deque
+
+JOBLOG_HEADER = "Seq\tHost\tStarttime\tJobRuntime\tSend\tReceive\tExitval\tSignal\tCommand\n"
+
+def read_sshlogin_file(path, default_slots):
+    '''Return the (node, slots) pairs in a list of nodes in the format of
+    GNU parallel, where a node may be given as slots/node.'''
+    nodes = []
+    f = open(path, 'r')
+    for line in f:
+        line = line.strip()
+        if line == '' or line.startswith('#'): continue
+        m = re.match('^(\d+)/(.*?)$', line)
+        if m:
+            nodes.append( (m.group(2), int(m.group(1))) )
+        else:
+            nodes.append( (line, default_slots) )
+    f.close()
+    if len(nodes) == 0:
+        raise Exception('The list of computing nodes is empty')
+    return nodes
+
+def read_joblog(path):
+    '''Return the exit codes of the jobs recorded in a joblog, by
+    sequence number.'''
+    codes = {}
+    if not os.path.exists(path):
+        return codes
+    f = open(path, 'r')
+    for line in f:
+        vals = line.split('\t')
+        if len(vals) < 8 or not re.match('^\d+$', vals[0]):
+            continue # the header
+        codes[int(vals[0])] = (int(vals[6]), int(vals[7]))
+    f.close()
+    return codes
+
+def make_command(template, line, colsep):
+    '''Put the arguments of a job in the command, quoted as for the
+    shell. If there is no replacement string, append them.'''
+    cols = [line]
+    if colsep is not None:
+        cols = re.split(colsep, line)
+    def replace(m):
+        if m.group(1) == '':
+            return pipes.quote(line)
+        i = int(m.group(1))
+        if i > len(cols):
+            return ''
+        return pipes.quote(cols[i - 1])
+    (cmd, count) = re.subn('\{(\d*)\}', replace, template)
+    if count == 0:
+        cmd += ' ' + ' '.join([pipes.quote(c) for c in cols])
+    return cmd
+
+def remote_command(node, cmd, workdir, env_vars):
+    '''The command to run a job on another node via ssh, in the given
+    directory and with the given environment variables as here.'''
+    parts = []
+    if workdir is not None:
+        parts.append('cd ' + pipes.quote(workdir))
+    exports = [var + '=' + pipes.quote(os.environ[var])
+               for var in env_vars if var in os.environ]
+    if len(exports) > 0:
+        parts.append('export ' + ' '.join(exports))
+    remote = ' && '.join(parts + [cmd])
+    if ' ' in node:
+        ssh = node.split() # the node is an ssh command
+    else:
+        ssh = ['ssh', '-o', 'BatchMode=yes', node]
+    return ' '.join([pipes.quote(s) for s in ssh] + [pipes.quote(remote)])
+
+class Executor(object):
+    '''Hand out jobs to the slots on the nodes as these free up, retry
+    the jobs which fail, and record each finished job in a joblog.'''
+
+    def __init__(self, template, nodes, colsep = None, joblog = None,
+                 retries = 1, resume_failed = False, workdir = None,
+                 env_vars = [], verbose = False):
+        self.template   = template
+        self.nodes      = nodes
+        self.colsep     = colsep
+        self.retries    = max(retries, 1) # the number of tries, as for GNU parallel
+        self.workdir    = workdir
+        self.env_vars   = env_vars
+        self.verbose    = verbose
+        self.cond       = threading.Condition()
+        self.pending    = deque() # (seq, line, tries)
+        self.running    = {}      # seq to process
+        self.reading    = True
+        self.num_failed = 0
+        self.stopped    = False
+
+        # Skip the jobs which succeeded in an earlier run
+        self.done = {}
+        if resume_failed and joblog is not None:
+            self.done = dict([(seq, code) for (seq, code) in
+                              read_joblog(joblog).items() if code == (0, 0)])
+        self.joblog = None
+        if joblog is not None:
+            exists = os.path.exists(joblog)
+            self.joblog = open(joblog, 'a' if resume_failed else 'w')
+            if not (resume_failed and exists):
+                self.joblog.write(JOBLOG_HEADER)
+                self.joblog.flush()
+
+    def add_job(self, seq, line):
+        with self.cond:
+            if seq not in self.done:
+                self.pending.append( (seq, line, 0) )
+                self.cond.notify()
+
+    def end_of_jobs(self):
+        with self.cond:
+            self.reading = False
+            self.cond.notify_all()
+
+    def next_job(self):
+        '''Wait for a job to run. Return None when all are done.'''
+        with self.cond:
+            while len(self.pending) == 0 and not self.stopped and \
+                  (self.reading or len(self.running) > 0):
+                self.cond.wait(1.0)
+            if self.stopped or len(self.pending) == 0:
+                return None
+            return self.pending.popleft()
+
+    def run_slot(self, node):
+        '''Run jobs one after another on a node.'''
+        while True:
+            job = self.next_job()
+            if job is None:
+                return
+            (seq, line, tries) = job
+            cmd = make_command(self.template, line, self.colsep)
+            shell_cmd = cmd
+            if node != ':':
+                shell_cmd = remote_command(node, cmd, self.workdir, self.env_vars)
+            if self.verbose:
+                print(shell_cmd)
+
+            start = time.time()
+            with self.cond:
+                if self.stopped:
+                    return
+                proc = subprocess.Popen(shell_cmd, shell=True)
+                self.running[seq] = proc
+            code = proc.wait()
+            runtime = time.time() - start
+            (exit_val, sig) = (code, 0)
+            if code < 0:
+                (exit_val, sig) = (-1, -code)
+
+            with self.cond:
+                del self.running[seq]
+                if code != 0 and tries + 1 < self.retries and not self.stopped:
+                    # Try again, on whichever slot frees up first
+                    self.pending.appendleft( (seq, line, tries + 1) )
+                else:
+                    if code != 0:
+                        self.num_failed += 1
+                    if self.joblog is not None:
+                        self.joblog.write("%d\t%s\t%.3f\t%.3f\t0\t0\t%d\t%d\t%s\n" %
+                                          (seq, node, start, runtime, exit_val, sig, cmd))
+                        self.joblog.flush()
+                self.cond.notify_all()
+
+    def stop(self):
+        '''Kill the running jobs and start no more.'''
+        with self.cond:
+            self.stopped = True
+            for proc in self.running.values():
+                try:
+                    proc.send_signal(signal.SIGTERM)
+                except OSError:
+                    pass
+            self.cond.notify_all()
+
+    def run(self, lines):
+        '''Run a job for each line, with the lines read as the jobs run.
+        Return the exit code GNU parallel would.'''
+        threads = []
+        for (node, slots) in self.nodes:
+            for i in range(slots):
+                t = threading.Thread(target=self.run_slot, args=(node,))
+                t.daemon = True
+                t.start()
+                threads.append(t)
+        try:
+            seq = 0
+            for line in lines:
+                line = line.rstrip('\n')
+                if line == '': continue
+                seq += 1
+                self.add_job(seq, line)
+            self.end_of_jobs()
+            # Join with a timeout, so that an interrupt is not ignored
+            for t in threads:
+                while t.is_alive():
+                    t.join(1.0)
+        except KeyboardInterrupt:
+            self.stop()
+            raise
+        if self.joblog is not None:
+            self.joblog.close()
+        return min(self.num_failed, 101)
+
+def read_lines(f):
+    '''Read lines from a file as they become available.'''
+    while True:
+        line = f.readline()
+        if line == '':
+            return
+        yield line
+
+def main(argsIn):
+
+    usage = "usage: asp_parallel_utils.py [options] command"
+    parser = optparse.OptionParser(usage=usage)
+    parser.disable_interspersed_args() # the command may have options
+    parser.add_option('-P', '--jobs', dest='jobs', type='int', default=None,
+                      help='The number of jobs to run at the same time on each node.')
+    parser.add_option('-a', '--arg-file', dest='arg_file', default=None,
+                      help='Read the arguments of the jobs from this file, rather than from standard input.')
+    parser.add_option('--colsep', dest='colsep', default=None,
+                      help='Split each line of arguments into columns with this regular expression.')
+    parser.add_option('--sshloginfile', dest='sshloginfile', default=None,
+                      help='The list of nodes to run the jobs on. A node may be given as slots/node.')
+    parser.add_option('--workdir', dest='workdir', default=None,
+                      help='Run the jobs in this directory on the other nodes.')
+    parser.add_option('--env', dest='env', action='append', default=[],
+                      help='Pass this environment variable to the jobs on the other nodes.')
+    parser.add_option('--joblog', dest='joblog', default=None,
+                      help='Record the finished jobs in this file, in the format of GNU parallel.')
+    parser.add_option('--retries', dest='retries', type='int', default=1,
+                      help='How many times to try a job before counting it as failed.')
+    parser.add_option('--resume-failed', dest='resume_failed', action='store_true', default=False,
+                      help='Skip the jobs which succeeded according to the joblog, and run the rest.')
+    parser.add_option('-u', '--ungroup', '--line-buffer', dest='ungroup', action='store_true',
+                      default=False, help='The output of the jobs is never grouped. For compatibility.')
+    parser.add_option('-v', '--verbose', dest='verbose', action='store_true', default=False,
+                      help='Print the commands being run.')
+    (options, args) = parser.parse_args(argsIn)
+
+    if len(args) == 0:
+        parser.print_help()
+        return 255
+    if options.resume_failed and options.joblog is None:
+        print('The option --resume-failed needs --joblog.')
+        return 255
+
+    slots = options.jobs
+    if slots is None or slots <= 0:
+        import multiprocessing
+        slots = multiprocessing.cpu_count()
+    if options.sshloginfile is not None:
+        nodes = read_sshlogin_file(options.sshloginfile, slots)
+    else:
+        nodes = [(':', slots)]
+
+    workdir = options.workdir
+    if workdir == '.':
+        workdir = os.getcwd()
+
+    executor = Executor(' '.join(args), nodes, options.colsep, options.joblog,
+                        options.retries, options.resume_failed, workdir,
+                        options.env, options.verbose)
+    if options.arg_file is not None and options.arg_file != '-':
+        f = open(options.arg_file, 'r')
+    else:
+        f = sys.stdin
+    return executor.run(read_lines(f))
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
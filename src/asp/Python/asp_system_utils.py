@@ -73,6 +73,31 @@ def get_num_cpus():
 
     return num_cpus
 
+def get_avail_mem_mb():
+    """Return the memory available for new processes on the current
+    machine, in MB, or None if it cannot be found."""
+
+    vals = {}
+    try:
+        f = open('/proc/meminfo', 'r')
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2:
+                vals[parts[0].rstrip(':')] = int(parts[1]) # in KB
+        f.close()
+    except (IOError, ValueError):
+        return None
+
+    # Older kernels do not estimate the available memory
+    if 'MemAvailable' in vals:
+        mem_kb = vals['MemAvailable']
+    elif 'MemFree' in vals:
+        mem_kb = vals['MemFree'] + vals.get('Buffers', 0) + vals.get('Cached', 0)
+    else:
+        return None
+
+    return mem_kb / 1024
+
 
 def checkIfToolExists(toolName):
     """Returns true if the system knows about the utility with this name (it is on the PATH)"""
@@ -125,31 +150,110 @@ def which(program, lookInLibexec = False):
 
     return None
 
-def getNumNodesInList(nodesListPath):
-    """Get number of Pleiades nodes listed in a file"""
+def parse_nodes_list(nodesListPath):
+    """Return the nodes listed in a file, without repetition (need
+    this for Pleiades), as (node, cpus) pairs. As for GNU parallel, a
+    node may be given as cpus/node, else its number of CPUs is None."""
 
     if nodesListPath is None:
-        return 1 # local machine
+        return [(':', None)] # local machine
 
-    # Count the number of nodes without repetition
-    # (need this for Pleiades).
-    nodes     = {}
-    num_nodes = 0
+    nodes = []
+    seen  = set()
     try:
         fileHandle = open(nodesListPath, "r")
         for line in fileHandle:
-            if re.match('^\s*$', line): continue # skip empty lines
-            matches = re.match('^\s*([^\s]*)', line)
+            if re.match('^\s*(#.*)?$', line): continue # skip empty lines and comments
+            node = line.strip()
+            cpus = None
+            matches = re.match('^(\d+)/(.*?)$', node)
             if matches:
-                nodes[matches.group(1)] = 1
-
-        num_nodes = len(nodes)
+                cpus = int(matches.group(1))
+                node = matches.group(2)
+            if node in seen: continue
+            seen.add(node)
+            nodes.append((node, cpus))
+        fileHandle.close()
     except Exception as e: # Fail on exception
         die(e)
-    if num_nodes == 0:
+    if len(nodes) == 0:
         raise Exception('The list of computing nodes is empty')
 
-    return num_nodes
+    return nodes
+
+def getNumNodesInList(nodesListPath):
+    """Get number of Pleiades nodes listed in a file"""
+    return len(parse_nodes_list(nodesListPath))
+
+def probe_node(node, timeout=30):
+    """Find the number of CPUs and the memory available, in MB, on a
+    node, via ssh. Return None for what could not be found."""
+
+    remote = 'getconf _NPROCESSORS_ONLN; grep MemAvailable /proc/meminfo'
+    if node == ':':
+        cmd = ['sh', '-c', remote]
+    elif ' ' in node:
+        cmd = node.split() + [remote] # the node is an ssh command
+    else:
+        cmd = ['ssh', '-o', 'BatchMode=yes', '-o', 'ConnectTimeout=' + str(timeout),
+               node, remote]
+    cpus   = None
+    mem_mb = None
+    try:
+        p = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        out, err = p.communicate()
+        for line in out.split("\n"):
+            m = re.match('^\s*(\d+)\s*$', line)
+            if m:
+                cpus = int(m.group(1))
+            m = re.match('^MemAvailable:\s*(\d+)', line)
+            if m:
+                mem_mb = int(m.group(1)) / 1024
+    except OSError:
+        pass
+    return (cpus, mem_mb)
+
+def get_nodes_resources(nodesListPath, probe=False):
+    """Return the (node, cpus, memory in MB) of each node in a list.
+    The number of CPUs is as given in the list, else, if asked, as
+    found via ssh, else as for the current machine. The memory is None
+    if it was not found via ssh."""
+
+    nodes = parse_nodes_list(nodesListPath)
+
+    probed = {}
+    to_probe = [node for (node, cpus) in nodes if probe and node != ':']
+    if len(to_probe) > 0:
+        from multiprocessing.pool import ThreadPool
+        print("Finding the CPUs and memory of " + str(len(to_probe)) + " node(s).")
+        pool = ThreadPool(min(len(to_probe), 32))
+        try:
+            probed = dict(zip(to_probe, pool.map(probe_node, to_probe)))
+        finally:
+            pool.close()
+
+    resources = []
+    for (node, cpus) in nodes:
+        (probed_cpus, mem_mb) = probed.get(node, (None, None))
+        if cpus is None:
+            cpus = probed_cpus
+        if cpus is None:
+            if node in probed:
+                print("Could not find the number of CPUs of node " + node +
+                      ", will assume it is like this one.")
+            cpus = get_num_cpus()
+        resources.append((node, cpus, mem_mb))
+
+    return resources
+
+def write_sshlogin_file(path, nodes, slots):
+    """Write a list of nodes for GNU parallel, with the number of jobs
+    to run at the same time on each."""
+    fileHandle = open(path, 'w')
+    for (node, num) in zip(nodes, slots):
+        fileHandle.write(str(num) + '/' + node + '\n')
+    fileHandle.close()
+    return path
 
 def check_parallel_version():
     # This error will never be reached for users of our packaged final
@@ -158,21 +262,31 @@ def check_parallel_version():
     if ver < '2013':
         die("Expecting a version of GNU parallel from at least 2013.")
 
-def runInGnuParallel(numParallelProcesses, commandString, argumentFilePath, parallelArgs=[], nodeListPath=None, verbose=False):
-    """Use GNU Parallel to spread task across multiple computers and processes"""
+def parallel_executor_cmd(executor):
+    """The command to run jobs in parallel, with GNU parallel, or with
+    the executor in asp_parallel_utils, which takes the same options."""
+    if executor == 'native':
+        return [sys.executable, libexec_path('asp_parallel_utils.py')]
+    return ['parallel']
+
+def runInGnuParallel(numParallelProcesses, commandString, argumentFilePath, parallelArgs=[], nodeListPath=None, verbose=False,
+                     executor='gnu'):
+    """Use GNU Parallel, or the executor in asp_parallel_utils, to spread task across multiple computers and processes"""
 
-    # Make sure GNU parallel is installed
-    if not checkIfToolExists('parallel'):
-        raise Exception('Need GNU Parallel to distribute the jobs.')
+    if executor != 'native':
+        # Make sure GNU parallel is installed
+        if not checkIfToolExists('parallel'):
+            raise Exception('Need GNU Parallel to distribute the jobs.')
 
-    # Ensure our 'parallel' is not out of date
-    check_parallel_version()
+        # Ensure our 'parallel' is not out of date
+        check_parallel_version()
 
     # Use GNU parallel with given number of processes.
     # Let output be interspersed, read input series from file
     # Start in the same directory on remote machines. Ensure
     # that vital env variables are copied over.
-    cmd = ['parallel',  '--workdir', os.getcwd(), '-u',
+    cmd = parallel_executor_cmd(executor) + \
+          ['--workdir', os.getcwd(), '-u',
            '--env', 'PATH', '--env', 'PYTHONPATH', '--env', 'ISISROOT',
            '--env', 'ISIS3DATA', '-a', argumentFilePath]
 